@@ -1,4 +1,8 @@
 #!/usr/bin/env python3
+import asyncio
+import concurrent.futures
+import copy
+import functools
 import logging
 import math
 import pathlib
@@ -8,6 +12,7 @@ import threading
 import time
 
 import ltr559
+import numpy as np
 import RPi.GPIO as GPIO
 import ST7735
 from fonts.ttf import RobotoMedium as UserFont
@@ -18,15 +23,27 @@ from grow import Piezo
 from grow.moisture import Moisture
 from grow.pump import Pump
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+log = logging.getLogger(__name__)
 
 FPS = 10
+UPDATE_INTERVAL = 1.0
 
 BUTTONS = [5, 6, 16, 24]
 LABELS = ["A", "B", "X", "Y"]
+PIN_TO_LABEL = dict(zip(BUTTONS, LABELS))
 
 DISPLAY_WIDTH = 160
 DISPLAY_HEIGHT = 80
 
+GRAPH_WIDTH = DISPLAY_WIDTH - 64
+GRAPH_HEIGHT = DISPLAY_HEIGHT - 8 - 20
+
 COLOR_WHITE = (255, 255, 255)
 COLOR_BLUE = (31, 137, 251)
 COLOR_GREEN = (99, 255, 124)
@@ -36,16 +53,115 @@ COLOR_BLACK = (0, 0, 0)
 
 
 # Only the ALPHA channel is used from these images
-icon_drop = Image.open("icons/icon-drop.png").convert("RGBA")
-icon_nodrop = Image.open("icons/icon-nodrop.png").convert("RGBA")
-icon_rightarrow = Image.open("icons/icon-rightarrow.png").convert("RGBA")
-icon_alarm = Image.open("icons/icon-alarm.png").convert("RGBA")
-icon_snooze = Image.open("icons/icon-snooze.png").convert("RGBA")
-icon_help = Image.open("icons/icon-help.png").convert("RGBA")
-icon_settings = Image.open("icons/icon-settings.png").convert("RGBA")
-icon_channel = Image.open("icons/icon-channel.png").convert("RGBA")
-icon_backdrop = Image.open("icons/icon-backdrop.png").convert("RGBA")
-icon_return = Image.open("icons/icon-return.png").convert("RGBA")
+icon_drop = Image.open("icons/icon-drop.png").convert("RGBA").split()[-1]
+icon_nodrop = Image.open("icons/icon-nodrop.png").convert("RGBA").split()[-1]
+icon_rightarrow = Image.open("icons/icon-rightarrow.png").convert("RGBA").split()[-1]
+icon_alarm = Image.open("icons/icon-alarm.png").convert("RGBA").split()[-1]
+icon_snooze = Image.open("icons/icon-snooze.png").convert("RGBA").split()[-1]
+icon_help = Image.open("icons/icon-help.png").convert("RGBA").split()[-1]
+icon_settings = Image.open("icons/icon-settings.png").convert("RGBA").split()[-1]
+icon_channel = Image.open("icons/icon-channel.png").convert("RGBA").split()[-1]
+icon_backdrop = Image.open("icons/icon-backdrop.png").convert("RGBA").split()[-1]
+icon_backdrop_90 = icon_backdrop.rotate(90)
+icon_backdrop_180 = icon_backdrop.rotate(180)
+icon_return = Image.open("icons/icon-return.png").convert("RGBA").split()[-1]
+
+
+@functools.lru_cache(maxsize=32)
+def truetype(path, size):
+    """Load a font once per size, so text reflowing doesn't reload it every frame."""
+    return ImageFont.truetype(path, size)
+
+
+@functools.lru_cache(maxsize=64)
+def text_mask(text, font):
+    """Rasterize text once, to be pasted in any color as a mask."""
+    mask = Image.new("L", font.getsize(text), 0)
+    ImageDraw.Draw(mask).text((0, 0), text, font=font, fill=255)
+    return mask
+
+
+@functools.lru_cache(maxsize=16)
+def reflow(text, font, rect, line_spacing=1.1):
+    """Given a rectangle, reflow and scale text to fit, centred.
+
+    Returns the position of each line and the bounds of the text.
+
+    """
+    x1, y1, x2, y2 = rect
+    width = x2 - x1
+    height = y2 - y1
+
+    while font.size > 0:
+        line_height = int(font.size * line_spacing)
+        max_lines = math.floor(height / line_height)
+        lines = []
+
+        # Determine if text can fit at current scale.
+        words = text.split(" ")
+
+        while len(lines) < max_lines and len(words) > 0:
+            line = []
+
+            while (
+                len(words) > 0
+                and font.getsize(" ".join(line + [words[0]]))[0] <= width
+            ):
+                line.append(words.pop(0))
+
+            lines.append(" ".join(line))
+
+        if len(lines) <= max_lines and len(words) == 0:
+            # Solution is found, position the text.
+            y = int(
+                y1
+                + (height / 2)
+                - (len(lines) * line_height / 2)
+                - (line_height - font.size) / 2
+            )
+
+            bounds = [x2, y, x1, y + len(lines) * line_height]
+            positioned = []
+
+            for line in lines:
+                line_width = font.getsize(line)[0]
+                x = int(x1 + (width / 2) - (line_width / 2))
+                bounds[0] = min(bounds[0], x)
+                bounds[2] = max(bounds[2], x + line_width)
+                positioned.append(((x, y), line))
+                y += line_height
+
+            return tuple(positioned), tuple(bounds)
+
+        font = truetype(font.path, font.size - 1)
+
+    return (), None
+
+
+def display_image(display, image):
+    """Send an RGB image to the display, packing it to RGB565 bytes in one NumPy pass.
+
+    ST7735.display() does the same packing but then turns every byte into a Python int
+    before writing, this skips that and writes the bytes directly.
+
+    """
+    rotation = getattr(display, "_rotation", None)
+    if rotation is None:
+        display.display(image)
+        return
+
+    pixels = np.rot90(np.asarray(image), rotation // 90).astype(np.uint16)
+    color = ((pixels[..., 0] & 0xF8) << 8) | ((pixels[..., 1] & 0xFC) << 3) | (pixels[..., 2] >> 3)
+
+    display.set_window()
+    display.data(color.astype(">u2").tobytes())
+
+
+@functools.lru_cache(maxsize=4)
+def load_yaml(path, mtime):
+    """Parse a YAML file, the cache is keyed on mtime so edits to the file are picked up."""
+    with open(path) as file:
+        return yaml.load(file, Loader=SafeLoader)
 
 
 class View:
@@ -53,8 +169,10 @@ class View:
         self._image = image
         self._draw = ImageDraw.Draw(image)
 
-        self.font = ImageFont.truetype(UserFont, 14)
-        self.font_small = ImageFont.truetype(UserFont, 10)
+        self.font = truetype(UserFont, 14)
+        self.font_small = truetype(UserFont, 10)
+
+        self._chrome = self.build_chrome()
 
     def button_a(self):
         return False
@@ -74,12 +192,51 @@ class View:
     def render(self):
         pass
 
+    def render_chrome(self):
+        """Draw the parts of this view that never change, called once to build its overlay."""
+        pass
+
+    def build_chrome(self):
+        """Run render_chrome onto a transparent overlay, returning the overlay and its position."""
+        image, draw = self._image, self._draw
+        self._image = Image.new("RGBA", (DISPLAY_WIDTH, DISPLAY_HEIGHT), (0, 0, 0, 0))
+        self._draw = ImageDraw.Draw(self._image)
+
+        try:
+            self.render_chrome()
+            chrome = self._image
+        finally:
+            self._image, self._draw = image, draw
+
+        bbox = chrome.getbbox()
+        if bbox is None:
+            return None
+
+        return chrome.crop(bbox), bbox[:2]
+
+    def chrome(self):
+        """Composite the overlay drawn by render_chrome onto the canvas."""
+        if self._chrome is not None:
+            overlay, position = self._chrome
+            self._image.paste(overlay, position, mask=overlay)
+
     def clear(self):
-        self._draw.rectangle((0, 0, DISPLAY_WIDTH, DISPLAY_HEIGHT), (0, 0, 0))
+        self.fill((0, 0, DISPLAY_WIDTH, DISPLAY_HEIGHT), COLOR_BLACK)
+
+    def fill(self, box, color):
+        """Fill a box, right and bottom edges exclusive, with a solid color."""
+        self._image.paste(color, box)
 
     def icon(self, icon, position, color):
-        col = Image.new("RGBA", icon.size, color=color)
-        self._image.paste(col, position, mask=icon)
+        if self._image.mode == "RGBA":
+            # Building a transparent overlay, keep its alpha straight so colors don't darken at the edges
+            tile = Image.new("RGBA", icon.size, color)
+            tile.putalpha(icon)
+            layer = Image.new("RGBA", self._image.size, (0, 0, 0, 0))
+            layer.paste(tile, position)
+            self._image.alpha_composite(layer)
+        else:
+            self._draw.bitmap(position, icon, fill=color)
 
     def label(
         self,
@@ -92,7 +249,7 @@ class View:
         if position not in ["A", "B", "X", "Y"]:
             raise ValueError(f"Invalid label position {position}")
 
-        text_w, text_h = self._draw.textsize(text, font=self.font)
+        text_w, text_h = text_mask(text, self.font).size
         text_h = 11
         text_w += margin * 2
         text_h += margin * 2
@@ -109,9 +266,7 @@ class View:
         x2, y2 = x + text_w, y + text_h
 
         self._draw.rectangle((x, y, x2, y2), bgcolor)
-        self._draw.text(
-            (x + margin, y + margin - 1), text, font=self.font, fill=textcolor
-        )
+        self.text((x + margin, y + margin - 1), text, textcolor)
 
     def overlay(self, text, top=0):
         """Draw an overlay with some auto-sized text."""
@@ -127,53 +282,21 @@ class View:
         )
 
     def text_in_rect(self, text, font, rect, line_spacing=1.1, textcolor=(0, 0, 0)):
-        x1, y1, x2, y2 = rect
-        width = x2 - x1
-        height = y2 - y1
-
-        # Given a rectangle, reflow and scale text to fit, centred
-        while font.size > 0:
-            space_width = font.getsize(" ")[0]
-            line_height = int(font.size * line_spacing)
-            max_lines = math.floor(height / line_height)
-            lines = []
-
-            # Determine if text can fit at current scale.
-            words = text.split(" ")
-
-            while len(lines) < max_lines and len(words) > 0:
-                line = []
-
-                while (
-                    len(words) > 0
-                    and font.getsize(" ".join(line + [words[0]]))[0] <= width
-                ):
-                    line.append(words.pop(0))
-
-                lines.append(" ".join(line))
-
-            if len(lines) <= max_lines and len(words) == 0:
-                # Solution is found, render the text.
-                y = int(
-                    y1
-                    + (height / 2)
-                    - (len(lines) * line_height / 2)
-                    - (line_height - font.size) / 2
-                )
+        lines, bounds = reflow(text, font, rect, line_spacing)
 
-                bounds = [x2, y, x1, y + len(lines) * line_height]
+        for position, line in lines:
+            self.text(position, line, textcolor)
 
-                for line in lines:
-                    line_width = font.getsize(line)[0]
-                    x = int(x1 + (width / 2) - (line_width / 2))
-                    bounds[0] = min(bounds[0], x)
-                    bounds[2] = max(bounds[2], x + line_width)
-                    self._draw.text((x, y), line, font=self.font, fill=textcolor)
-                    y += line_height
+        return bounds
 
-                return tuple(bounds)
+    def number_offset(self, number):
+        """Return the x offset that centres a channel number in its 16px wide icon."""
+        tw, th = text_mask(number, self.font).size
+        return int(math.ceil(8 - (tw / 2.0)))
 
-            font = ImageFont.truetype(font.path, font.size - 1)
+    def text(self, position, text, color, font=None):
+        """Draw text that doesn't change between frames from a cached mask."""
+        self.icon(text_mask(text, font or self.font), position, color)
 
 
 class MainView(View):
@@ -183,25 +306,34 @@ class MainView(View):
 
     """
 
+    bar_x = 33
+    bar_margin = 2
+    bar_width = 30
+    label_width = 16
+    label_y = 0
+
     def __init__(self, image, channels=None, alarm=None):
         self.channels = channels
         self.alarm = alarm
 
         View.__init__(self, image)
 
+        # Bar and label positions don't change, so work them out once per channel
+        self._bar_x = {}
+        self._label_x = {}
+        self._number_x = {}
+
+        for channel in channels or []:
+            x = self.bar_x + (self.bar_width + self.bar_margin) * (channel.channel - 1)
+            self._bar_x[channel.channel] = x
+            self._label_x[channel.channel] = x + (self.bar_width - self.label_width) // 2
+            self._number_x[channel.channel] = self._label_x[channel.channel] + self.number_offset(channel.number)
+
     def render_channel(self, channel):
-        bar_x = 33
-        bar_margin = 2
-        bar_width = 30
-        label_width = 16
-        label_height = 16
-        label_y = 0
-
-        x = [
-            bar_x,
-            bar_x + ((bar_width + bar_margin) * 1),
-            bar_x + ((bar_width + bar_margin) * 2),
-        ][channel.channel - 1]
+        bar_width = self.bar_width
+        label_y = self.label_y
+
+        x = self._bar_x[channel.channel]
 
         # Saturation amounts from each sensor
         saturation = channel.sensor.saturation
@@ -221,17 +353,13 @@ class MainView(View):
         )
 
         # Channel selection icons
-        x += (bar_width - label_width) // 2
-
-        self.icon(icon_channel, (x, label_y), (200, 200, 200) if active else (64, 64, 64))
+        self.icon(icon_channel, (self._label_x[channel.channel], label_y), (200, 200, 200) if active else (64, 64, 64))
 
         # TODO: replace number text with graphic
-        tw, th = self.font.getsize(str(channel.channel))
-        self._draw.text(
-            (x + int(math.ceil(8 - (tw / 2.0))), label_y + 1),
-            str(channel.channel),
-            font=self.font,
-            fill=(55, 55, 55) if active else (100, 100, 100),
+        self.text(
+            (self._number_x[channel.channel], label_y + 1),
+            channel.number,
+            (55, 55, 55) if active else (100, 100, 100),
         )
 
     def render(self):
@@ -240,13 +368,16 @@ class MainView(View):
         for channel in self.channels:
             self.render_channel(channel)
 
+        self.alarm.render((3, DISPLAY_HEIGHT - 23))
+
+        self.chrome()
+
+    def render_chrome(self):
         # Icons
         self.icon(icon_backdrop, (0, 0), COLOR_WHITE)
         self.icon(icon_rightarrow, (3, 3), (55, 55, 55))
 
-        self.alarm.render((3, DISPLAY_HEIGHT - 23))
-
-        self.icon(icon_backdrop.rotate(180), (DISPLAY_WIDTH - 26, 0), COLOR_WHITE)
+        self.icon(icon_backdrop_180, (DISPLAY_WIDTH - 26, 0), COLOR_WHITE)
         self.icon(icon_settings, (DISPLAY_WIDTH - 19 - 3, 3), (55, 55, 55))
 
 
@@ -262,10 +393,13 @@ class EditView(View):
 
         View.__init__(self, image)
 
-    def render(self):
-        self.icon(icon_backdrop.rotate(180), (DISPLAY_WIDTH - 26, 0), COLOR_WHITE)
+    def render_chrome(self):
+        self.icon(icon_backdrop_180, (DISPLAY_WIDTH - 26, 0), COLOR_WHITE)
         self.icon(icon_return, (DISPLAY_WIDTH - 19 - 3, 3), (55, 55, 55))
 
+        self.icon(icon_help, (0, 0), COLOR_BLUE)
+
+    def render(self):
         option = self._options[self._current_option]
         title = option["title"]
         prop = option["prop"]
@@ -295,11 +429,11 @@ class EditView(View):
         self._draw.text((3, 36), f"{title} : {text}", font=self.font, fill=COLOR_WHITE)
 
         if self._help_mode:
-            self.icon(icon_backdrop.rotate(90), (0, 0), COLOR_BLUE)
-            self._draw.rectangle((7, 3, 23, 19), COLOR_BLACK)
+            self.icon(icon_backdrop_90, (0, 0), COLOR_BLUE)
+            self.fill((7, 3, 24, 20), COLOR_BLACK)
             self.overlay(help, top=26)
 
-        self.icon(icon_help, (0, 0), COLOR_BLUE)
+        self.chrome()
 
     def button_a(self):
         self._help_mode = not self._help_mode
@@ -372,14 +506,12 @@ class SettingsView(EditView):
     def __init__(self, image, options=[]):
         EditView.__init__(self, image, options)
 
+    def render_chrome(self):
+        self.text((28, 5), "Settings", COLOR_WHITE)
+        EditView.render_chrome(self)
+
     def render(self):
         self.clear()
-        self._draw.text(
-            (28, 5),
-            "Settings",
-            font=self.font,
-            fill=COLOR_WHITE,
-        )
         EditView.render(self)
 
 
@@ -420,25 +552,30 @@ class DetailView(ChannelView):
 
     """
 
+    x_positions = [40, 72, 104]
+
+    def __init__(self, image, channel):
+        ChannelView.__init__(self, image, channel)
+
+        self._label_x = self.x_positions[channel.channel - 1]
+        self._number_x = self._label_x + self.number_offset(channel.number)
+
+        self._graph = np.zeros((GRAPH_HEIGHT + 1, GRAPH_WIDTH + 1, 3), dtype=np.uint8)
+
     def render(self):
         self.clear()
 
         if self.channel.enabled:
-            graph_height = DISPLAY_HEIGHT - 8 - 20
-            graph_width = DISPLAY_WIDTH - 64
+            graph_height = GRAPH_HEIGHT
+            graph_width = GRAPH_WIDTH
 
             graph_x = (DISPLAY_WIDTH - graph_width) // 2
             graph_y = 8
 
             self.draw_status((graph_x, graph_y + graph_height + 4))
 
-            self._draw.rectangle((graph_x, graph_y, graph_x + graph_width, graph_y + graph_height), (50, 50, 50))
-
-            for x, value in enumerate(self.channel.sensor.history[:graph_width]):
-                color = self.channel.indicator_color(value)
-                h = value * graph_height
-                x = graph_x + graph_width - x - 1
-                self._draw.rectangle((x, graph_y + graph_height - h, x + 1, graph_y + graph_height), color)
+            render_history(self.channel.sensor.history, self._graph, self.channel.lut)
+            self._image.paste(Image.fromarray(self._graph, "RGB"), (graph_x, graph_y))
 
             alarm_line = int(self.channel.warn_level * graph_height)
             r = 255
@@ -472,25 +609,23 @@ class DetailView(ChannelView):
 
         # Channel icons
 
-        x_positions = [40, 72, 104]
-        label_x = x_positions[self.channel.channel - 1]
-        label_y = 0
-
         active = self.channel.sensor.active and self.channel.enabled
 
-        for x in x_positions:
-            self.icon(icon_channel, (x, label_y - 10), (16, 16, 16))
+        self.chrome()
 
-        self.icon(icon_channel, (label_x, label_y), (200, 200, 200))
+        self.icon(icon_channel, (self._label_x, 0), (200, 200, 200))
 
-        tw, th = self.font.getsize(str(self.channel.channel))
-        self._draw.text(
-            (label_x + int(math.ceil(8 - (tw / 2.0))), label_y + 1),
-            str(self.channel.channel),
-            font=self.font,
-            fill=(55, 55, 55) if active else (100, 100, 100),
+        self.text(
+            (self._number_x, 1),
+            self.channel.number,
+            (55, 55, 55) if active else (100, 100, 100),
         )
 
+    def render_chrome(self):
+        # Channel icons
+        for x in self.x_positions:
+            self.icon(icon_channel, (x, -10), (16, 16, 16))
+
         # Next button
         self.icon(icon_backdrop, (0, 0), COLOR_WHITE)
         self.icon(icon_rightarrow, (3, 3), (55, 55, 55))
@@ -500,7 +635,7 @@ class DetailView(ChannelView):
         # self.icon(icon_return, (3, DISPLAY_HEIGHT - 26 + 3), (55, 55, 55))
 
         # Edit
-        self.icon(icon_backdrop.rotate(180), (DISPLAY_WIDTH - 26, 0), COLOR_WHITE)
+        self.icon(icon_backdrop_180, (DISPLAY_WIDTH - 26, 0), COLOR_WHITE)
         self.icon(icon_settings, (DISPLAY_WIDTH - 19 - 3, 3), (55, 55, 55))
 
 
@@ -618,6 +753,121 @@ class ChannelEditView(ChannelView, EditView):
             self.draw_context((34, 6), option["context"])
 
 
+def build_lut(palette):
+    """Build a 256 entry table of RGB uint8 colours, indexed by int(saturation * 255).
+
+    Saturation 1.0 maps to the first palette colour and 0.0 to the last, blending linearly between them.
+
+    """
+    palette = np.array(palette, dtype=np.float64)
+    stops = np.arange(len(palette))
+    positions = np.linspace(len(palette) - 1, 0, 256)
+
+    return np.stack([np.interp(positions, stops, palette[:, i]) for i in range(3)], axis=-1).astype(np.uint8)
+
+
+def render_history(history, out, lut):
+    """Draw saturation history, newest first, as a bar graph into out.
+
+    out is a (GRAPH_HEIGHT + 1, GRAPH_WIDTH + 1, 3) uint8 RGB array, reused between frames.
+
+    """
+    out[...] = 50
+
+    history = np.asarray(history[:GRAPH_WIDTH])
+    if len(history) == 0:
+        return
+
+    colors = lut[(history * 255).astype(np.uint8)]
+    rows = np.arange(GRAPH_HEIGHT + 1)[:, None]
+    bars = (rows >= np.floor(GRAPH_HEIGHT - history * GRAPH_HEIGHT))[..., None]
+    x = GRAPH_WIDTH - 1 - np.arange(len(history))
+
+    # Each sample is two pixels wide, the older sample overlapping the newer one
+    out[:, x] = np.where(bars, colors, out[:, x])
+    out[:, x + 1] = np.where(bars, colors, out[:, x + 1])
+
+
+class ChannelBank:
+    """Settings and state for a set of channels, stored as one NumPy array per field.
+
+    Each Channel reads and writes its own element through BankField attributes,
+    so updating every channel at once takes a handful of array operations.
+
+    """
+
+    fields = {
+        "enabled": bool,
+        "alarm": bool,
+        "auto_water": bool,
+        "water_level": float,
+        "warn_level": float,
+        "watering_delay": float,
+        "last_dose": float,
+        "saturation": float,
+    }
+
+    def __init__(self):
+        self.channels = []
+
+        for name, dtype in self.fields.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+
+    def add(self, channel):
+        """Add a channel to the bank, returning its index."""
+        self.channels.append(channel)
+
+        for name, dtype in self.fields.items():
+            setattr(self, name, np.append(getattr(self, name), np.zeros(1, dtype=dtype)))
+
+        return len(self.channels) - 1
+
+    def update(self, now):
+        self.saturation[:] = [channel.sensor.saturation for channel in self.channels]
+
+        needs_water = (
+            self.enabled
+            & self.auto_water
+            & (self.saturation < self.water_level)
+            & (now - self.last_dose > self.watering_delay)
+        )
+
+        for index in np.nonzero(needs_water)[0]:
+            channel = self.channels[index]
+            channel.pump.dose(channel.pump_speed, channel.pump_time, blocking=False)
+            self.last_dose[index] = now
+            log.info(
+                "Watering Channel: %d - rate %.2f for %.2fsec",
+                channel.channel, channel.pump_speed, channel.pump_time
+            )
+
+        below_warn_level = self.saturation < self.warn_level
+
+        for index in np.nonzero(self.enabled & below_warn_level & ~self.alarm)[0]:
+            log.warning(
+                "Alarm on Channel: %d - saturation is %.2f%% (warn level %.2f%%)",
+                self.channels[index].channel, self.saturation[index] * 100, self.warn_level[index] * 100
+            )
+
+        # Disabled channels keep whatever alarm state they had
+        self.alarm[:] = np.where(self.enabled, below_warn_level, self.alarm)
+
+
+class BankField:
+    """A Channel attribute stored in its ChannelBank."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, channel, owner=None):
+        if channel is None:
+            return self
+        return getattr(channel._bank, self.name)[channel._index].item()
+
+    def __set__(self, channel, value):
+        getattr(channel._bank, self.name)[channel._index] = value
+
+
 class Channel:
     colors = [
         COLOR_BLUE,
@@ -625,6 +875,15 @@ class Channel:
         COLOR_YELLOW,
         COLOR_RED
     ]
+    lut = build_lut(colors)
+
+    enabled = BankField()
+    alarm = BankField()
+    auto_water = BankField()
+    water_level = BankField()
+    warn_level = BankField()
+    watering_delay = BankField()
+    last_dose = BankField()
 
     def __init__(
         self,
@@ -642,8 +901,12 @@ class Channel:
         icon=None,
         auto_water=False,
         enabled=False,
+        bank=None,
     ):
+        self._bank = bank if bank is not None else ChannelBank()
+        self._index = self._bank.add(self)
         self.channel = display_channel
+        self.number = str(display_channel)
         self.sensor = Moisture(sensor_channel)
         self.pump = Pump(pump_channel)
         self.water_level = water_level
@@ -654,23 +917,15 @@ class Channel:
         self.watering_delay = watering_delay
         self._wet_point = wet_point
         self._dry_point = dry_point
-        self.last_dose = time.time()
+        self.last_dose = time.monotonic()
         self.icon = icon
-        self._enabled = enabled
+        self.enabled = enabled
         self.alarm = False
         self.title = f"Channel {display_channel}" if title is None else title
 
         self.sensor.set_wet_point(wet_point)
         self.sensor.set_dry_point(dry_point)
 
-    @property
-    def enabled(self):
-        return self._enabled
-
-    @enabled.setter
-    def enabled(self, enabled):
-        self._enabled = enabled
-
     @property
     def wet_point(self):
         return self._wet_point
@@ -693,21 +948,7 @@ class Channel:
         value = self.sensor.moisture
 
     def indicator_color(self, value):
-        value = 1.0 - value
-
-        if value == 1.0:
-            return self.colors[-1]
-        if value == 0.0:
-            return self.colors[0]
-
-        value *= len(self.colors) - 1
-        a = int(math.floor(value))
-        b = a + 1
-        blend = float(value - a)
-
-        r, g, b = [int(((self.colors[b][i] - self.colors[a][i]) * blend) + self.colors[a][i]) for i in range(3)]
-
-        return (r, g, b)
+        return tuple(self.lut[int(value * 255)].tolist())
 
     def update_from_yml(self, config):
         if config is not None:
@@ -747,40 +988,9 @@ Dry point: {dry_point}
             dry_point=self.dry_point,
         )
 
-    def water(self):
-        if not self.auto_water:
-            return False
-        if time.time() - self.last_dose > self.watering_delay:
-            self.pump.dose(self.pump_speed, self.pump_time, blocking=False)
-            self.last_dose = time.time()
-            return True
-        return False
-
     def render(self, image, font):
         pass
 
-    def update(self):
-        if not self.enabled:
-            return
-        sat = self.sensor.saturation
-        if sat < self.water_level:
-            if self.water():
-                logging.info(
-                    "Watering Channel: {} - rate {:.2f} for {:.2f}sec".format(
-                        self.channel, self.pump_speed, self.pump_time
-                    )
-                )
-        if sat < self.warn_level:
-            if not self.alarm:
-                logging.warning(
-                    "Alarm on Channel: {} - saturation is {:.2f}% (warn level {:.2f}%)".format(
-                        self.channel, sat * 100, self.warn_level * 100
-                    )
-                )
-            self.alarm = True
-        else:
-            self.alarm = False
-
 
 class Alarm(View):
     def __init__(self, image, enabled=True, interval=10.0, beep_frequency=440):
@@ -789,7 +999,7 @@ class Alarm(View):
         self.interval = interval
         self.beep_frequency = beep_frequency
         self._triggered = False
-        self._time_last_beep = time.time()
+        self._time_last_beep = time.monotonic()
         self._sleep_until = None
 
         View.__init__(self, image)
@@ -799,9 +1009,9 @@ class Alarm(View):
             self.enabled = config.get("alarm_enable", self.enabled)
             self.interval = config.get("alarm_interval", self.interval)
 
-    def update(self, lights_out=False):
+    def update(self, now, lights_out=False):
         if self._sleep_until is not None:
-            if self._sleep_until > time.time():
+            if self._sleep_until > now:
                 return
             self._sleep_until = None
 
@@ -809,7 +1019,7 @@ class Alarm(View):
             self.enabled
             and not lights_out
             and self._triggered
-            and time.time() - self._time_last_beep > self.interval
+            and now - self._time_last_beep > self.interval
         ):
             self.piezo.beep(self.beep_frequency, 0.1, blocking=False)
             threading.Timer(
@@ -824,7 +1034,7 @@ class Alarm(View):
                 args=[self.beep_frequency, 0.1],
                 kwargs={"blocking": False},
             ).start()
-            self._time_last_beep = time.time()
+            self._time_last_beep = now
 
             self._triggered = False
 
@@ -856,8 +1066,11 @@ class Alarm(View):
     def sleeping(self):
         return self._sleep_until is not None
 
+    def triggered(self):
+        return self._triggered
+
     def sleep(self, duration=500):
-        self._sleep_until = time.time() + duration
+        self._sleep_until = time.monotonic() + duration
 
 
 class ViewController:
@@ -952,7 +1165,8 @@ class Config:
 
         if settings_file.is_file():
             try:
-                self.config = yaml.safe_load(open(settings_file))
+                # set() edits the config in place, so keep the cached parse untouched
+                self.config = copy.deepcopy(load_yaml(settings_file, settings_file.stat().st_mtime))
             except yaml.parser.ParserError as e:
                 raise yaml.parser.ParserError(
                     "Error parsing settings file: {} ({})".format(settings_file, e)
@@ -999,26 +1213,37 @@ class Config:
 
 def main():
     def handle_button(pin):
-        index = BUTTONS.index(pin)
-        label = LABELS[index]
-
-        if label == "A":  # Select View
-            viewcontroller.button_a()
-
-        if label == "B":  # Sleep Alarm
-            if not viewcontroller.button_b():
-                if viewcontroller.home:
-                    if alarm.sleeping():
-                        alarm.cancel_sleep()
-                    else:
-                        alarm.sleep()
-
-        if label == "X":
-            viewcontroller.button_x()
-
-        if label == "Y":
-            viewcontroller.button_y()
+        nonlocal dirty
+        dirty = True
+
+        handlers[PIN_TO_LABEL[pin]]()
+
+    def button_b():  # Sleep Alarm
+        if not viewcontroller.button_b():
+            if viewcontroller.home:
+                if alarm.sleeping():
+                    alarm.cancel_sleep()
+                else:
+                    alarm.sleep()
+
+    def display_state(light_level_low):
+        """Summarise everything shown on the display, to tell when a redraw is needed.
+
+        Settings changed from the buttons aren't included, handle_button marks the display dirty instead.
+
+        """
+        return (
+            viewcontroller.view,
+            light_level_low,
+            alarm.sleeping(),
+            tuple(
+                (channel.enabled, channel.alarm, channel.sensor.active, channel.sensor.moisture)
+                for channel in channels
+            ),
+        )
 
+    dirty = True
+    light_level_low = False
 
     # Set up the ST7735 SPI Display
     display = ST7735.ST7735(
@@ -1030,17 +1255,21 @@ def main():
     light = ltr559.LTR559()
 
     # Set up our canvas and prepare for drawing
-    image = Image.new("RGBA", (DISPLAY_WIDTH, DISPLAY_HEIGHT), color=(255, 255, 255))
+    image = Image.new("RGB", (DISPLAY_WIDTH, DISPLAY_HEIGHT), color=(255, 255, 255))
+
+    # Second buffer, sent to the display while the next frame is drawn
+    image_back = Image.new("RGB", (DISPLAY_WIDTH, DISPLAY_HEIGHT), color=(255, 255, 255))
 
     # Setup blank image for darkness
-    image_blank = Image.new("RGBA", (DISPLAY_WIDTH, DISPLAY_HEIGHT), color=(0, 0, 0))
+    image_blank = Image.new("RGB", (DISPLAY_WIDTH, DISPLAY_HEIGHT), color=(0, 0, 0))
 
 
     # Pick a random selection of plant icons to display on screen
+    bank = ChannelBank()
     channels = [
-        Channel(1, 1, 1),
-        Channel(2, 2, 2),
-        Channel(3, 3, 3),
+        Channel(1, 1, 1, bank=bank),
+        Channel(2, 2, 2, bank=bank),
+        Channel(3, 3, 3, bank=bank),
     ]
 
     alarm = Alarm(image)
@@ -1051,9 +1280,6 @@ def main():
     GPIO.setwarnings(False)
     GPIO.setup(BUTTONS, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
-    for pin in BUTTONS:
-        GPIO.add_event_detect(pin, GPIO.FALLING, handle_button, bouncetime=200)
-
     config.load()
 
     for channel in channels:
@@ -1121,36 +1347,94 @@ Low Light Value {:.2f}
         ]
     )
 
-    while True:
-        for channel in channels:
-            config.set_channel(channel.channel, channel)
-            channel.update()
-            if channel.alarm:
+    handlers = {
+        "A": viewcontroller.button_a,  # Select View
+        "B": button_b,
+        "X": viewcontroller.button_x,
+        "Y": viewcontroller.button_y,
+    }
+
+    async def update_loop():
+        nonlocal light_level_low
+
+        while True:
+            bank.update(time.monotonic())
+
+            for channel in channels:
+                config.set_channel(channel.channel, channel)
+
+            light_level_low = light.get_lux() < config.get_general().get("light_level_low")
+
+            config.set_general(
+                {
+                    "alarm_enable": alarm.enabled,
+                    "alarm_interval": alarm.interval,
+                }
+            )
+
+            config.save()
+
+            await asyncio.sleep(UPDATE_INTERVAL)
+
+    async def alarm_loop():
+        while True:
+            # Re-trigger every tick, Alarm.update clears the trigger after each beep
+            if any(channel.alarm for channel in channels):
                 alarm.trigger()
 
-        light_level_low = light.get_lux() < config.get_general().get("light_level_low")
+            alarm.update(time.monotonic(), light_level_low)
 
-        alarm.update(light_level_low)
+            await asyncio.sleep(1.0 / FPS)
 
-        viewcontroller.update()
-        viewcontroller.render()
+    async def render_loop():
+        nonlocal dirty
+        loop = asyncio.get_running_loop()
+        last_state = None
+        pending = None
 
-        if light_level_low and config.get_general().get("black_screen_when_light_low"):
-            display.display(image_blank.convert("RGB"))
+        # A single worker keeps frames in order, and spidev releases the GIL while sending
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
-        else:
-            display.display(image.convert("RGB"))
+        while True:
+            viewcontroller.update()
 
-        config.set_general(
-            {
-                "alarm_enable": alarm.enabled,
-                "alarm_interval": alarm.interval,
-            }
-        )
+            # Alarms pulse, so keep redrawing while the alarm is triggered or any channel is in alarm
+            state = display_state(light_level_low)
+            if dirty or state != last_state or alarm.triggered() or any(channel.alarm for channel in channels):
+                dirty = False
+                last_state = state
+
+                if light_level_low and config.get_general().get("black_screen_when_light_low"):
+                    frame = image_blank
+
+                else:
+                    viewcontroller.render()
+                    frame = image_back
+
+                # Wait for the previous frame to finish sending before reusing its buffer
+                if pending is not None:
+                    await pending
+
+                if frame is image_back:
+                    image_back.paste(image)
+
+                pending = loop.run_in_executor(executor, display_image, display, frame)
+
+            await asyncio.sleep(1.0 / FPS)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+
+        # Button callbacks arrive on the RPi.GPIO thread, hand them over to the event loop
+        def on_button(pin):
+            loop.call_soon_threadsafe(handle_button, pin)
+
+        for pin in BUTTONS:
+            GPIO.add_event_detect(pin, GPIO.FALLING, on_button, bouncetime=200)
 
-        config.save()
+        await asyncio.gather(update_loop(), alarm_loop(), render_loop())
 
-        time.sleep(1.0 / FPS)
+    asyncio.run(run())
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 import time
+import numpy
 import RPi.GPIO as GPIO
 
 MOISTURE_1_PIN = 23
@@ -30,8 +31,10 @@ class Moisture(object):
 
         self._count = 0
         self._reading = 0
-        self._history = []
         self._history_length = 200
+        self._history = numpy.zeros(self._history_length * 2)
+        self._history_index = 0
+        self._history_count = 0
         self._last_pulse = time.time()
         self._new_data = False
         self._wet_point = wet_point if wet_point is not None else 0.7
@@ -58,22 +61,33 @@ dtoverlay=spi0-cs,cs0_pin=14 # Re-assign CS0 from BCM 8 so that Grow can use it
         self._last_pulse = time.time()
         if self._time_elapsed >= 1.0:
             self._reading = self._count / self._time_elapsed
-            self._history.insert(0, self._reading)
-            self._history = self._history[:self._history_length]
+            self._add_history(self._reading)
             self._count = 0
             self._time_last_reading = time.time()
             self._new_data = True
 
+    def _add_history(self, reading):
+        # Each reading is stored twice, one history length apart, so the
+        # latest readings are always a contiguous, newest first, slice.
+        # Readers may run on another thread, so both slots are written
+        # before the new index is published.
+        index = (self._history_index - 1) % self._history_length
+        self._history[index] = reading
+        self._history[index + self._history_length] = reading
+        self._history_index = index
+        self._history_count = min(self._history_count + 1, self._history_length)
+
     @property
     def history(self):
-        history = []
-
-        for moisture in self._history:
-            saturation = float(moisture - self._dry_point) / self.range
-            saturation = round(saturation, 3)
-            history.append(max(0.0, min(1.0, saturation)))
-
-        return history
+        """Return the saturation history as a numpy array, newest reading first."""
+        # _add_history() assigns the index before the count, so read them in the
+        # opposite order. A reading that lands in between leaves the window one
+        # sample short rather than reaching past the written slots.
+        count = self._history_count
+        index = self._history_index
+        history = self._history[index:index + count]
+        saturation = numpy.round((history - self._dry_point) / self.range, 3)
+        return numpy.clip(saturation, 0.0, 1.0)
 
     @property
     def _time_elapsed(self):
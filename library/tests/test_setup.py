@@ -27,6 +27,42 @@ def test_moisture_read(GPIO, smbus):
     assert Moisture(channel=3).moisture == 0
 
 
+def test_moisture_history(GPIO, smbus):
+    from grow.moisture import Moisture
+
+    ch1 = Moisture(channel=1, wet_point=1, dry_point=27)
+
+    assert len(ch1.history) == 0
+
+    ch1._add_history(27)
+    ch1._add_history(14)
+    ch1._add_history(1)
+
+    assert list(ch1.history) == [1.0, 0.5, 0.0]
+
+    for _ in range(250):
+        ch1._add_history(27)
+
+    assert len(ch1.history) == ch1._history_length
+    assert list(ch1.history[:3]) == [0.0, 0.0, 0.0]
+
+
+def test_moisture_history_concurrent_add(GPIO, smbus):
+    from grow.moisture import Moisture
+
+    ch1 = Moisture(channel=1, wet_point=1, dry_point=27)
+
+    for _ in range(5):
+        ch1._add_history(14)
+
+    # A reading arriving between history reading the count and the index
+    count = ch1._history_count
+    ch1._add_history(14)
+    index = ch1._history_index
+
+    assert list(ch1._history[index:index + count]) == [14] * 5
+
+
 def test_pump_setup(GPIO, smbus):
     from grow.pump import Pump, PUMP_PWM_FREQ
 